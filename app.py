@@ -1,95 +1,347 @@
 import streamlit as st
 import psycopg2
-import pandas as pd
-from passlib.hash import bcrypt
-from datetime import datetime
+import psycopg2.extensions
+from psycopg2.pool import ThreadedConnectionPool
+import bcrypt
+import hashlib
+import hmac
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from io import StringIO
+from typing import Iterable
+
+logger = logging.getLogger(__name__)
 
 # ------------------------------------------------------------------------------
 # 1. Подключаемся к БД (PostgreSQL)
 # ------------------------------------------------------------------------------
-# Вместо @st.singleton / @st.experimental_singleton используем @st.cache_resource
+class PreparedConnection(psycopg2.extensions.connection):
+    """Соединение, которое помнит, подготовлены ли на нём запросы (PREPARE).
+
+    Работает в autocommit: одиночный запрос не тянет за собой отдельные
+    BEGIN и COMMIT/ROLLBACK. Где нужна атомарность нескольких запросов,
+    транзакцию открываем явно через `with conn:`.
+    """
+    prepared = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.autocommit = True
+
+# Размер пула, если в secrets не задан pool_size. Подбирается под число
+# одновременно выполняемых скриптов Streamlit (по потоку на активную сессию)
+# так, чтобы pool_size + 1 (слушатель NOTIFY) на каждую реплику укладывались
+# в max_connections сервера.
+# minconn = maxconn: psycopg2 закрывает возвращённое соединение, если
+# свободных уже minconn, и тогда каждая выдача сверх minconn открывала бы
+# новое соединение и заново готовила на нём запросы.
+POOL_SIZE = 5
+
+# Тайм-аут подключения в секундах, если в secrets не задан connect_timeout
+CONNECT_TIMEOUT = 10
+
+def pool_size() -> int:
+    return int(st.secrets["postgres"].get("pool_size", POOL_SIZE))
+
+def connect_params() -> dict:
+    """Параметры подключения из secrets (общие для пула и слушателя NOTIFY)."""
+    pg = st.secrets["postgres"]
+    params = {key: pg[key] for key in ("host", "port", "database", "user", "password")}
+    params["connect_timeout"] = pg.get("connect_timeout", CONNECT_TIMEOUT)
+    return params
+
+# Вместо @st.singleton / @st.experimental_singleton используем @st.cache_resource.
+# Кэшируем не одно соединение, а пул: каждая сессия берёт своё соединение.
 @st.cache_resource
-def get_connection():
-    conn = psycopg2.connect(
-        host=st.secrets["postgres"]["host"],
-        port=st.secrets["postgres"]["port"],
-        database=st.secrets["postgres"]["database"],
-        user=st.secrets["postgres"]["user"],
-        password=st.secrets["postgres"]["password"],
+def get_pool() -> ThreadedConnectionPool:
+    return ThreadedConnectionPool(
+        minconn=pool_size(),
+        maxconn=pool_size(),
+        connection_factory=PreparedConnection,
+        **connect_params(),
     )
-    return conn
+
+# ThreadedConnectionPool при нехватке соединений сразу бросает PoolError;
+# семафор на pool_size мест заставляет лишние сессии подождать свободное
+@st.cache_resource
+def get_pool_slots() -> threading.BoundedSemaphore:
+    return threading.BoundedSemaphore(pool_size())
+
+@contextmanager
+def conn_ctx(prepare: bool = True):
+    """Берёт соединение из пула и возвращает его обратно по выходе из блока.
+
+    Если все соединения заняты, ждёт освобождения одного из них.
+    """
+    pool = get_pool()
+    with get_pool_slots():
+        conn = pool.getconn()
+        try:
+            if prepare:
+                prepare_statements(conn)
+            yield conn
+        finally:
+            pool.putconn(conn)
+
+# ------------------------------------------------------------------------------
+# 1.1. Подготовленные запросы (PREPARE): разбор и план строятся один раз
+#      на соединение, дальше выполняем их через EXECUTE
+# ------------------------------------------------------------------------------
+PREPARED_STATEMENTS = {
+    "user_ins": """(text, text) AS
+        INSERT INTO users (email, password_hash) VALUES ($1, $2)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING id""",
+    "auth_sel": "(text) AS SELECT id, password_hash FROM users WHERE email = $1",
+    "user_rehash": "(integer, text) AS UPDATE users SET password_hash = $2 WHERE id = $1",
+    "note_ins": """(integer, text) AS
+        INSERT INTO notes (user_id, text) VALUES ($1, $2)
+        RETURNING id, created_at""",
+    "notes_sel": """(integer) AS
+        SELECT id, text, created_at
+        FROM notes
+        WHERE user_id = $1
+        ORDER BY created_at DESC""",
+}
+
+def prepare_statements(conn):
+    """Подготавливает все запросы на соединении одним обращением к серверу."""
+    if conn.prepared:
+        return
+    with conn.cursor() as cur:
+        cur.execute("".join(
+            f"PREPARE {name} {body};" for name, body in PREPARED_STATEMENTS.items()
+        ))
+    conn.prepared = True
 
 # ------------------------------------------------------------------------------
 # 2. Инициализируем таблицы (users, notes) - вызываем один раз при старте
 # ------------------------------------------------------------------------------
+# Объект, последним добавленный в схему: если он есть, схема уже готова.
+# DDL ниже идёт одной транзакцией, поэтому частично созданной схемы не бывает.
+# Имя без схемы: ищется по тому же search_path, в котором DDL создаёт объекты.
+SCHEMA_SENTINEL = "notify_notes_changed()"
+
+# cache_resource: init_db выполняется один раз на процесс, а не на каждый rerun
+@st.cache_resource
 def init_db():
-    conn = get_connection()
-    with conn.cursor() as cur:
-        # Таблица пользователей
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL
-            );
-        """)
-        # Таблица заметок
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS notes (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL,
-                text TEXT NOT NULL,
-                created_at TIMESTAMP NOT NULL DEFAULT NOW(),
-                FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-            );
-        """)
-        conn.commit()
+    # Запросы готовим только после создания таблиц: PREPARE проверяет их существование
+    with conn_ctx(prepare=False) as conn:
+        with conn.cursor() as cur:
+            # Схему уже создал другой процесс — обходимся одним запросом вместо DDL
+            cur.execute("SELECT to_regprocedure(%s);", (SCHEMA_SENTINEL,))
+            if cur.fetchone()[0] is not None:
+                return
+        # Весь DDL — одной транзакцией (with conn открывает её и в autocommit)
+        with conn, conn.cursor() as cur:
+            # Таблица пользователей
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id SERIAL PRIMARY KEY,
+                    email VARCHAR(255) UNIQUE NOT NULL,
+                    password_hash VARCHAR(255) NOT NULL
+                );
+            """)
+            # Таблица заметок
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS notes (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+                );
+            """)
+            # Индекс под load_notes (WHERE user_id = ... ORDER BY created_at DESC):
+            # выборка идёт диапазоном по индексу, без seq scan и сортировки.
+            # text в INCLUDE не кладём: длинные заметки упрутся в лимит размера строки B-tree.
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_notes_user_created
+                ON notes (user_id, created_at DESC);
+            """)
+            # Обновляем статистику, чтобы планировщик сразу выбрал новый индекс
+            cur.execute("ANALYZE notes;")
+            # Уведомление об изменении заметок шлёт сама БД: отдельный
+            # pg_notify из приложения стоил бы лишнего обращения к серверу на
+            # каждую запись. Триггер уровня оператора шлёт по одному уведомлению
+            # на пользователя, даже если COPY вставил тысячи строк.
+            cur.execute(f"""
+                CREATE OR REPLACE FUNCTION notify_notes_changed() RETURNS trigger AS $$
+                BEGIN
+                    PERFORM pg_notify('{NOTES_CHANNEL}', user_id::text)
+                    FROM (SELECT DISTINCT user_id FROM new_notes) AS changed;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+            cur.execute("DROP TRIGGER IF EXISTS notes_changed ON notes;")
+            cur.execute("""
+                CREATE TRIGGER notes_changed
+                AFTER INSERT ON notes
+                REFERENCING NEW TABLE AS new_notes
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_notes_changed();
+            """)
+
+# ------------------------------------------------------------------------------
+# 2.1. Хэширование паролей
+# ------------------------------------------------------------------------------
+# Используем pyca/bcrypt напрямую (нативная реализация, без обёртки passlib).
+# На время вычисления хэша он отпускает GIL, поэтому долгая проверка пароля
+# в одной сессии не блокирует потоки остальных сессий Streamlit.
+# Формат хэшей ($2b$) совместим с ранее созданными через passlib.
+# bcrypt учитывает только первые 72 байта пароля; passlib молча обрезал
+# длинные пароли, а свежие версии pyca/bcrypt на них падают — обрезаем сами.
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+# Стоимость bcrypt (log2 числа раундов) задаётся в secrets: bcrypt_cost.
+# По умолчанию 10 (~50 мс на проверку) вместо стандартных 12 (~200 мс):
+# вход в ~4 раза быстрее, но и перебор утёкших хэшей во столько же раз дешевле.
+# Для боевого развёртывания стоит выставить bcrypt_cost = 12.
+# Старые хэши продолжают проверяться (стоимость записана в самом хэше).
+# Хэши дешевле BCRYPT_COST пересчитываются при первом успешном входе;
+# более дорогие не трогаем — понижать стоимость сохранённых хэшей
+# необратимо, поэтому снижение bcrypt_cost действует только на новые.
+BCRYPT_COST = int(st.secrets.get("bcrypt_cost", 10))
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+
+def hash_password(password: str) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(BCRYPT_COST)).decode()
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return bcrypt.checkpw(_password_bytes(password), password_hash.encode())
+
+def password_hash_cost(password_hash: str) -> int:
+    """Стоимость из хэша вида $2b$12$..."""
+    return int(password_hash.split("$")[2])
+
+@st.cache_resource
+def dummy_password_hash() -> str:
+    """Хэш случайного пароля для проверки, когда email не найден.
+
+    Так ответ для несуществующего email занимает столько же времени,
+    сколько и для существующего, и по времени нельзя перебирать адреса.
+    Стоимость — BCRYPT_COST, её получают все новые и пересчитанные хэши.
+    Отличимы по времени только аккаунты со старыми хэшами другой
+    стоимости: более дешёвые — пока не пересчитаны при входе, более
+    дорогие — пока остаются (понижать их мы не стали).
+    """
+    return hash_password(os.urandom(16).hex())
+
+# Строим холостой хэш при загрузке модуля (cache_resource — один раз на
+# процесс), а не на первом входе с неизвестным email — иначе тот ответ
+# выделялся бы по времени
+dummy_password_hash()
+
+# ------------------------------------------------------------------------------
+# 2.2. Кэш успешных проверок пароля
+# ------------------------------------------------------------------------------
+LOGIN_CACHE_SIZE = 128
+
+class LoginCache:
+    """LRU успешных входов: повторный вход с тем же паролем не считает bcrypt.
+
+    Ключ — (email, хэш из БД, HMAC пароля на случайном ключе процесса):
+    сам пароль в памяти не хранится, а смена пароля меняет хэш и,
+    значит, ключ.
+    """
+
+    def __init__(self, maxsize: int = LOGIN_CACHE_SIZE):
+        self._maxsize = maxsize
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, email: str, password_hash: str, password: str) -> tuple:
+        digest = hmac.new(self._secret, password.encode(), hashlib.sha256).digest()
+        return email, password_hash, digest
+
+    def contains(self, email: str, password_hash: str, password: str) -> bool:
+        key = self._key(email, password_hash, password)
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, email: str, password_hash: str, password: str):
+        key = self._key(email, password_hash, password)
+        with self._lock:
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def forget(self, email: str):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == email]:
+                del self._entries[key]
+
+# Модуль перезапускается Streamlit при каждом rerun, поэтому сам кэш
+# держим в cache_resource — один на процесс
+@st.cache_resource
+def get_login_cache() -> LoginCache:
+    return LoginCache()
 
 # ------------------------------------------------------------------------------
 # 3. Регистрация нового пользователя
 # ------------------------------------------------------------------------------
 def register_user(email: str, password: str) -> bool:
     """Возвращает True, если регистрация прошла успешно, иначе False (например, email уже существует)."""
-    conn = get_connection()
-    with conn.cursor() as cur:
-        # Проверим, нет ли такого email
-        cur.execute("SELECT id FROM users WHERE email=%s;", (email,))
-        existing = cur.fetchone()
-        if existing is not None:
-            # Уже есть пользователь с таким email
-            return False
-
-        # Хэшируем пароль
-        password_hash = bcrypt.hash(password)
-        # Вставляем запись
-        cur.execute(
-            "INSERT INTO users (email, password_hash) VALUES (%s, %s)",
-            (email, password_hash)
-        )
-        conn.commit()
-        return True
+    # Хэшируем пароль до запроса, чтобы не держать соединение на время bcrypt
+    password_hash = hash_password(password)
+    with conn_ctx() as conn, conn.cursor() as cur:
+        # Проверка email и вставка одним запросом: при занятом email
+        # ON CONFLICT ничего не вставит и RETURNING вернёт пустой результат
+        cur.execute("EXECUTE user_ins (%s, %s);", (email, password_hash))
+        created = cur.fetchone() is not None
+    return created
 
 # ------------------------------------------------------------------------------
 # 4. Аутентификация (проверка логина/пароля)
 # ------------------------------------------------------------------------------
 def authenticate_user(email: str, password: str) -> bool:
     """Проверяем логин+пароль, при успехе сохраняем в session_state user_id."""
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute("SELECT id, password_hash FROM users WHERE email=%s;", (email,))
+    # Поиск хэша — один подготовленный запрос (auth_sel), а bcrypt проверяем
+    # здесь, а не через pgcrypto crypt() в БД: pgcrypto не везде понимает хэши
+    # $2b$, а сотни миллисекунд bcrypt на каждый вход легли бы на сервер БД,
+    # общий для всех реплик приложения.
+    with conn_ctx() as conn, conn.cursor() as cur:
+        cur.execute("EXECUTE auth_sel (%s);", (email,))
         row = cur.fetchone()
-        if row is None:
-            return False
-        user_id, password_hash = row
-        # Сверяем хэш
-        if bcrypt.verify(password, password_hash):
-            # Сохраняем в сессии
-            st.session_state["authenticated"] = True
-            st.session_state["user_id"] = user_id
-            st.session_state["email"] = email
-            return True
-        else:
-            return False
+    # Соединение уже вернули в пул: на время bcrypt оно ему не нужно
+    if row is None:
+        # Тратим на неизвестный email то же время, что и на настоящую проверку
+        verify_password(password, dummy_password_hash())
+        return False
+    user_id, password_hash = row
+    # Сверяем хэш (успешные проверки помним, неуспешные — всегда через bcrypt)
+    login_cache = get_login_cache()
+    if login_cache.contains(email, password_hash, password):
+        verified = True
+    else:
+        verified = verify_password(password, password_hash)
+        if verified:
+            if password_hash_cost(password_hash) < BCRYPT_COST:
+                # Хэш дешевле текущей стоимости — усиливаем, пока пароль известен
+                password_hash = hash_password(password)
+                with conn_ctx() as conn, conn.cursor() as cur:
+                    cur.execute("EXECUTE user_rehash (%s, %s);", (user_id, password_hash))
+            login_cache.add(email, password_hash, password)
+    if verified:
+        # Сохраняем в сессии
+        st.session_state["authenticated"] = True
+        st.session_state["user_id"] = user_id
+        st.session_state["email"] = email
+        return True
+    else:
+        return False
 
 # ------------------------------------------------------------------------------
 # 5. Проверка, авторизован ли пользователь
@@ -101,29 +353,114 @@ def is_authenticated() -> bool:
 # 6. Добавление новой заметки
 # ------------------------------------------------------------------------------
 def add_note(user_id: int, text: str):
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute(
-            "INSERT INTO notes (user_id, text, created_at) VALUES (%s, %s, %s)",
-            (user_id, text, datetime.now())
-        )
-        conn.commit()
+    """Добавляет заметку и возвращает (id, created_at) новой записи.
+
+    Время создания проставляет сама БД (DEFAULT NOW()).
+    """
+    with conn_ctx() as conn, conn.cursor() as cur:
+        cur.execute("EXECUTE note_ins (%s, %s);", (user_id, text))
+        note_id, created_at = cur.fetchone()
+    # Свой кэш сбрасываем сразу, не дожидаясь уведомления от слушателя
+    load_notes.clear(user_id)
+    return note_id, created_at
+
+# ------------------------------------------------------------------------------
+# 6.1. Массовый импорт заметок
+# ------------------------------------------------------------------------------
+# Для импорта (например, из загруженного файла) построчный INSERT слишком
+# медленный: COPY передаёт все строки одним потоком без разбора и
+# планирования каждого запроса, а сам COPY атомарен.
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def add_notes_bulk(user_id: int, texts: Iterable[str]) -> int:
+    """Добавляет пачку заметок через COPY и возвращает их количество."""
+    buf = StringIO()
+    count = 0
+    for text in texts:
+        buf.write(f"{user_id}\t{text.translate(_COPY_ESCAPES)}\n")
+        count += 1
+    if not count:
+        return 0
+    buf.seek(0)
+    with conn_ctx() as conn, conn.cursor() as cur:
+        cur.copy_expert("COPY notes (user_id, text) FROM STDIN WITH (FORMAT text)", buf)
+    load_notes.clear(user_id)
+    return count
 
 # ------------------------------------------------------------------------------
 # 7. Загрузка заметок для текущего пользователя
 # ------------------------------------------------------------------------------
-def load_notes(user_id: int) -> pd.DataFrame:
-    conn = get_connection()
-    with conn.cursor() as cur:
-        cur.execute("""
-            SELECT id, text, created_at
-            FROM notes
-            WHERE user_id = %s
-            ORDER BY created_at DESC;
-        """, (user_id,))
-        rows = cur.fetchall()
-    df = pd.DataFrame(rows, columns=["id", "text", "created_at"])
-    return df
+# Результат кэшируется по user_id: перерисовки страницы (клики по виджетам,
+# навигация) не ходят в БД, пока заметки не изменились. Изменения приходят
+# через LISTEN/NOTIFY (см. ниже), TTL остаётся страховкой на случай
+# пропущенного уведомления
+NOTES_CACHE_TTL = 600
+
+@st.cache_data(ttl=NOTES_CACHE_TTL, show_spinner=False)
+def load_notes(user_id: int) -> list[tuple]:
+    """Возвращает заметки пользователя списком кортежей (id, text, created_at).
+
+    Обычные кортежи, а не NamedTupleCursor: st.cache_data хранит результат
+    через pickle, а классы строк NamedTupleCursor создаются на лету и не
+    сериализуются.
+    """
+    with conn_ctx() as conn, conn.cursor() as cur:
+        cur.execute("EXECUTE notes_sel (%s);", (user_id,))
+        return cur.fetchall()
+
+# ------------------------------------------------------------------------------
+# 7.1. Сброс кэша заметок по LISTEN/NOTIFY
+# ------------------------------------------------------------------------------
+# Триггер notes_changed (см. init_db) после каждой вставки в notes шлёт
+# в канал notes_changed id пользователя; уведомление уходит после фиксации.
+# Фоновый поток каждого процесса (реплики) слушает канал на отдельном
+# соединении и сбрасывает кэш load_notes этого пользователя, так что
+# заметки из другой вкладки или реплики видны сразу.
+NOTES_CHANNEL = "notes_changed"
+LISTEN_TIMEOUT = 5
+LISTEN_RETRY_DELAY = 5
+
+def _listen_notes_changed(params: dict):
+    # Поток запускается один раз на процесс и не перезапускается, поэтому
+    # любая ошибка соединения ведёт к переподключению, а не к выходу
+    while True:
+        try:
+            conn = psycopg2.connect(**params)
+        except psycopg2.Error:
+            logger.exception("notes listener: cannot connect")
+            time.sleep(LISTEN_RETRY_DELAY)
+            continue
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {NOTES_CHANNEL};")
+            # Пока соединения не было, уведомления могли потеряться
+            load_notes.clear()
+            while True:
+                if select.select([conn], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    load_notes.clear(int(notify.payload))
+        except (psycopg2.Error, OSError, ValueError):
+            # ValueError/OSError — select на уже закрытом дескрипторе
+            logger.exception("notes listener: connection lost, reconnecting")
+            time.sleep(LISTEN_RETRY_DELAY)
+        finally:
+            conn.close()
+
+@st.cache_resource
+def start_notes_listener() -> threading.Thread:
+    """Запускает слушателя notes_changed один раз на процесс."""
+    thread = threading.Thread(
+        target=_listen_notes_changed,
+        args=(connect_params(),),
+        name="notes-listener",
+        daemon=True,
+    )
+    thread.start()
+    return thread
 
 # ------------------------------------------------------------------------------
 # 8. Главная логика Streamlit
@@ -131,6 +468,7 @@ def load_notes(user_id: int) -> pd.DataFrame:
 def main():
     # При первом запуске создаём таблицы (если не созданы)
     init_db()
+    start_notes_listener()
 
     # Инициализируем переменные в сессии при необходимости
     if "authenticated" not in st.session_state:
@@ -141,7 +479,7 @@ def main():
     # Шапка
     st.title("Пример приложения с аутентификацией (cache_resource)")
     st.write("""
-        Пример замены @st.singleton на @st.cache_resource (Streamlit >= 1.22).
+        Пример замены @st.singleton на @st.cache_resource (Streamlit >= 1.34).
     """)
 
     # Меню навигации (упрощённое)
@@ -165,7 +503,8 @@ def main():
             elif len(email) < 5 or len(password) < 4:
                 st.warning("Слишком короткий email или пароль.")
             else:
-                success = register_user(email, password)
+                with st.spinner("Регистрируем..."):
+                    success = register_user(email, password)
                 if success:
                     st.success("Регистрация прошла успешно! Теперь можете войти.")
                 else:
@@ -177,8 +516,14 @@ def main():
         email = st.text_input("Email")
         password = st.text_input("Пароль", type="password")
         if st.button("Войти"):
-            if authenticate_user(email, password):
+            with st.spinner("Проверяем пароль..."):
+                ok = authenticate_user(email, password)
+            if ok:
                 st.success("Успешный вход!")
+                # Греем кэш заметок: следующим шагом почти всегда открывают
+                # «Мои заметки». Сообщение выше уже отправлено в браузер,
+                # так что запрос к БД не задерживает его отрисовку.
+                load_notes(st.session_state["user_id"])
             else:
                 st.error("Неправильный логин или пароль.")
 
@@ -194,22 +539,23 @@ def main():
             new_note = st.text_area("Новая заметка")
             if st.button("Добавить"):
                 if new_note.strip():
-                    add_note(st.session_state["user_id"], new_note.strip())
-                    st.success("Заметка добавлена!")
+                    _, created_at = add_note(st.session_state["user_id"], new_note.strip())
+                    st.success(f"Заметка добавлена ({created_at})!")
                 else:
                     st.warning("Пустая заметка!")
 
             # Отобразим все заметки пользователя
-            df_notes = load_notes(st.session_state["user_id"])
-            if df_notes.empty:
+            notes = load_notes(st.session_state["user_id"])
+            if not notes:
                 st.info("Пока нет заметок.")
             else:
-                for index, row in df_notes.iterrows():
-                    st.write(f"- **{row['created_at']}**: {row['text']}")
+                for note_id, text, created_at in notes:
+                    st.write(f"- **{created_at}**: {text}")
 
     # --- (E) Выход (logout) ---
     elif choice == "Выход":
         if is_authenticated():
+            get_login_cache().forget(st.session_state["email"])
             st.session_state["authenticated"] = False
             st.session_state["user_id"] = None
             st.session_state["email"] = None